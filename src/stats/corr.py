@@ -1,9 +1,161 @@
+import hashlib
+from collections import OrderedDict
+
 import numpy as np
 import pandas as pd
 from scipy.stats import norm, rankdata
+from numba import njit, prange
+from joblib import Parallel, delayed
 from .visual import scatter_plot, plot_correlation
 import ppscore as pps
 
+# Each entry holds an n-length group index, so the cache is bounded by bytes as well as entries.
+_TARGET_RANKS_CACHE = OrderedDict()
+_TARGET_RANKS_CACHE_SIZE = 8
+_TARGET_RANKS_CACHE_BYTES = 256 * 2 ** 20
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _xi_batch(order, y_group, first_rank):
+    """
+    Compute the Xi nominator of y against every variable in parallel.
+
+    Parameters
+    ----------
+    order : numpy.ndarray
+        Column-wise argsort of the independent variables, shape (n, V).
+    y_group : numpy.ndarray
+        Index of the distinct value of each y observation, shape (n,).
+    first_rank : numpy.ndarray
+        Ordinal rank of the first occurrence of each distinct y value, shape (k,).
+
+    Returns
+    -------
+    numpy.ndarray
+        The sum of absolute differences of consecutive ordinal ranks of y for each of the V variables.
+    """
+    n, V = order.shape
+    out = np.empty(V)
+    for j in prange(V):
+        # Tied y values get consecutive ranks in the order they appear along x, so no per-variable sort is needed.
+        seen = np.zeros(first_rank.shape[0], dtype=np.int64)
+        nominator = 0.0
+        prev = 0
+        for i in range(n):
+            g = y_group[order[i, j]]
+            r = first_rank[g] + seen[g]
+            seen[g] += 1
+            if i > 0:
+                nominator += abs(r - prev)
+            prev = r
+        out[j] = nominator
+    return out
+
+
+def _rank_target(y, use_cache=True):
+    """
+    Rank the target column for the Xi correlation, reusing the result for identical targets.
+
+    Parameters
+    ----------
+    y : numpy.ndarray
+        The dependent variable.
+    use_cache : bool, optional
+        Whether to look up and store the ranks in the module cache (default is True).
+
+    Returns
+    -------
+    y_group : numpy.ndarray
+        Index of the distinct value of each observation.
+    counts : numpy.ndarray
+        Number of observations of each distinct value, in ascending order of value.
+    """
+    if not use_cache:
+        _, y_group, counts = np.unique(y, return_inverse=True, return_counts=True)
+        return y_group.reshape(-1), counts
+
+    # Keyed on the content rather than the frame, so mutated or garbage collected frames never hit stale ranks.
+    key = (y.dtype.str, len(y), hashlib.blake2b(pd.util.hash_array(y)).digest())
+    if key in _TARGET_RANKS_CACHE:
+        _TARGET_RANKS_CACHE.move_to_end(key)
+        return _TARGET_RANKS_CACHE[key]
+
+    y_group, counts = _rank_target(y, use_cache=False)
+    # The smallest integer type that indexes every distinct value keeps cached entries compact.
+    y_group = y_group.astype(np.min_scalar_type(max(len(counts) - 1, 0)))
+    if y_group.nbytes + counts.nbytes > _TARGET_RANKS_CACHE_BYTES:
+        return y_group, counts
+
+    y_group.flags.writeable = False
+    counts.flags.writeable = False
+    _TARGET_RANKS_CACHE[key] = (y_group, counts)
+    while (len(_TARGET_RANKS_CACHE) > _TARGET_RANKS_CACHE_SIZE or
+           sum(g.nbytes + c.nbytes for g, c in _TARGET_RANKS_CACHE.values()) > _TARGET_RANKS_CACHE_BYTES):
+        _TARGET_RANKS_CACHE.popitem(last=False)
+    return y_group, counts
+
+
+def _xi_statistics(X, y, ties='auto', use_cache=True):
+    """
+    Calculate the Xi correlation of y against every column of X.
+
+    Parameters
+    ----------
+    X : numpy.ndarray
+        The independent variables, shape (n, V).
+    y : numpy.ndarray
+        The dependent variable, shape (n,).
+    ties : {'auto', bool}, optional
+        How to handle ties in the data:
+        - 'auto' (default): Decide based on the uniqueness of y values.
+        - True: Assume ties are present.
+        - False: Assume no ties are present.
+    use_cache : bool, optional
+        Whether to reuse the ranks of a target seen in an earlier call (default is True).
+
+    Returns
+    -------
+    numpy.ndarray
+        The Xi correlation coefficient for each of the V variables.
+
+    Raises
+    ------
+    ValueError
+        If the ties parameter is not 'auto' or a boolean.
+    """
+    n = len(y)
+    if ties != "auto" and not isinstance(ties, bool):
+        raise ValueError(f"Expected ties to be either 'auto' or boolean, got {ties} ({type(ties)}) instead")
+
+    if pd.isna(y).any():
+        # Missing values have no rank, so the statistic is undefined for every variable.
+        xicor = np.full(X.shape[1], np.nan)
+    else:
+        y_group, counts = _rank_target(y, use_cache=use_cache)
+        if ties == "auto":
+            ties = len(counts) < n
+
+        # Sort every variable at once with NumPy, then rank y along each ordering in parallel from the
+        # ranks of y computed once above. scipy.stats.chatterjeexi (SciPy >= 1.15) is deliberately not
+        # used here: it is plain NumPy, always pays for a second rankdata pass and the p-value, and uses
+        # max ranks in the numerator, which changes the statistic when y has ties.
+        order = np.argsort(X, axis=0, kind='quicksort')
+        first_rank = np.cumsum(counts) - counts + 1
+        nominator = _xi_batch(order, y_group, first_rank)
+
+        if ties:
+            # Every observation of a distinct value has max rank equal to the cumulative count up to
+            # that value, so sum(l * (n - l)) only needs the value counts of y.
+            cum = np.cumsum(counts, dtype=np.float64)
+            denominator = 2 * np.sum(counts * cum * (n - cum))
+            nominator = nominator * n
+        else:
+            denominator = np.power(n, 2) - 1
+            nominator = nominator * 3
+
+        xicor = 1 - nominator / denominator
+    return xicor
+
 
 class CorrelationAnalyzer:
     """
@@ -35,6 +187,11 @@ class CorrelationAnalyzer:
             - 'auto' (default): Decide based on the uniqueness of y values.
             - True: Assume ties are present.
             - False: Assume no ties are present.
+        hue_col : str, optional
+            Column name for the color encoding of the scatter plot (default is None).
+        n_sample : int, optional
+            Number of rows to sample for the scatter plot and the 'pearson', 'kendall' and 'spearman'
+            correlations (default is None, which uses all rows).
 
         Returns
         -------
@@ -49,7 +206,7 @@ class CorrelationAnalyzer:
         if method=='scatter':
             return scatter_plot(data, variable_col, target_col, hue_col, n_sample=n_sample)
         elif method in [ 'pearson', 'kendall', 'spearman']:
-            return CorrelationAnalyzer._get_correlation(data, variable_col, target_col)
+            return CorrelationAnalyzer._get_correlation(data, variable_col, target_col, method=method, n_sample=n_sample)
         elif method == 'ppscore':
             return CorrelationAnalyzer._get_ppscore(data, variable_col, target_col)
         elif method == 'xicor':
@@ -63,9 +220,9 @@ class CorrelationAnalyzer:
         return plot_correlation(ax, corr_df)
     
     @staticmethod
-    def _get_correlation(data, variable_col, target_col):
+    def _get_correlation(data, variable_col, target_col, method='pearson', n_sample=None, random_state=111):
         """
-        Calculate the Pearson correlation between the target column and other variables.
+        Calculate the Pearson, Spearman or Kendall correlation between the target column and other variables.
 
         Parameters
         ----------
@@ -75,21 +232,51 @@ class CorrelationAnalyzer:
             List of column names to be used as independent variables.
         target_col : str
             The name of the dependent variable column.
+        method : {'pearson', 'spearman', 'kendall'}, optional
+            The correlation coefficient to compute (default is 'pearson').
+        n_sample : int, optional
+            Number of rows to sample without replacement before computing the correlation
+            (default is None, which uses all rows).
+        random_state : int, optional
+            Seed for random sampling (default is 111).
 
         Returns
         -------
         pandas.DataFrame
-            DataFrame containing the Pearson correlation between the target column and each variable.
+            DataFrame containing the correlation between the target column and each variable.
         """
-        non_zero_varlist = [target_col] + variable_col
-        correlations = data[non_zero_varlist].corr(method='pearson').unstack().sort_values(ascending=False)
-        correlations = pd.DataFrame(correlations).reset_index()
-        correlations.columns = ['col1', 'col2', 'correlation']
-        _corr = correlations.query(f"col1 == '{target_col}' & col2 != '{target_col}'")
+        if n_sample is not None and len(data) > n_sample:
+            idx = np.random.default_rng(random_state).choice(len(data), n_sample, replace=False)
+            data = data.iloc[idx]
+
+        X = data[variable_col].to_numpy(dtype=np.float64, na_value=np.nan)
+        y = data[target_col].to_numpy(dtype=np.float64, na_value=np.nan)
+        n = len(y)
+
+        if method == 'kendall' or np.isnan(X).any() or np.isnan(y).any():
+            # Kendall has no closed form over ranks and missing values need pairwise deletion,
+            # both of which pandas handles per column.
+            corr = pd.DataFrame(X).corrwith(pd.Series(y), method=method).to_numpy()
+        else:
+            if method == 'spearman':
+                # Spearman is Pearson on average ranks, so rank every column once and reuse the kernel below.
+                X = rankdata(X, axis=0)
+                y = rankdata(y)
+            # Only the target row is needed, so center the variables once and take a single BLAS
+            # matrix-vector product against the z-scored target instead of building the full matrix.
+            X_centered = np.empty(X.shape, order='F')
+            np.subtract(X, X.mean(axis=0), out=X_centered)
+            X_std = X_centered.std(axis=0, ddof=1)
+            y_std = y.std(ddof=1)
+            z_y = (y - y.mean()) / (y_std if y_std > 0 else np.nan)
+            corr = (X_centered.T @ z_y) / ((n - 1) * np.where(X_std > 0, X_std, np.nan))
+
+        _corr = pd.DataFrame({'col1': target_col, 'col2': variable_col, 'correlation': corr})
+        _corr = _corr.sort_values('correlation', ascending=False).reset_index(drop=True)
         return _corr
 
     @staticmethod
-    def _get_ppscore(data, variable_col, target_col):
+    def _get_ppscore(data, variable_col, target_col, n_jobs=-1):
         """
         Calculate the Predictive Power Score (PPS) between the target column and other variables.
 
@@ -101,19 +288,25 @@ class CorrelationAnalyzer:
             List of column names to be used as independent variables.
         target_col : str
             The name of the dependent variable column.
+        n_jobs : int, optional
+            Number of worker processes used to score the variables in parallel (default is -1, all cores).
 
         Returns
         -------
         pandas.DataFrame
             DataFrame containing the PPS between the target column and each variable.
         """
-        _pscore = pps.predictors(data[variable_col + [target_col]], y=target_col)
-        _pscore = _pscore[['y', 'x', 'ppscore']]
+        # Each variable is scored independently, so only its own column and the target are shipped to a worker.
+        scores = Parallel(n_jobs=n_jobs, backend='loky')(
+            delayed(pps.score)(data[[x, target_col]], x, target_col) for x in variable_col
+        )
+        scores.sort(key=lambda item: item['ppscore'], reverse=True)
+        _pscore = pd.DataFrame(scores)[['y', 'x', 'ppscore']]
         _pscore.columns = ['col1', 'col2', 'ppscore']
         return _pscore
 
     @staticmethod
-    def _get_xicor_score(data, variable_col, target_col, ties='auto'):
+    def _get_xicor_score(data, variable_col, target_col, ties='auto', cache_ranks=True):
         """
         Calculate the Xi correlation for multiple variable-target pairs and return a sorted DataFrame.
 
@@ -130,24 +323,24 @@ class CorrelationAnalyzer:
             - 'auto' (default): Decide based on the uniqueness of y values.
             - True: Assume ties are present.
             - False: Assume no ties are present.
+        cache_ranks : bool, optional
+            Whether to reuse the ranks of a target seen in an earlier call (default is True).
 
         Returns
         -------
         pandas.DataFrame
             DataFrame containing Xi correlations and p-values, sorted by the Xi correlation.
         """
-        scores = [CorrelationAnalyzer._xicordf(data, x, target_col, ties) for x in variable_col]
-        scores.sort(key=lambda item: item['xicor'], reverse=True)
-
-        df_columns = ["x", "y", "xicor", "p-value"]
-        data_dict = {column: [score[column] for score in scores] for column in df_columns}
-        scores_df = pd.DataFrame.from_dict(data_dict)
-        scores_df =scores_df[['y', 'x', 'xicor']]
-        scores_df.columns=['col1', 'col2', 'xicor']
+        X = data[variable_col].to_numpy()
+        y = data[target_col].to_numpy()
+        xicor = _xi_statistics(X, y, ties=ties, use_cache=cache_ranks)
+
+        scores_df = pd.DataFrame({'col1': target_col, 'col2': variable_col, 'xicor': xicor})
+        scores_df = scores_df.sort_values('xicor', ascending=False, kind='stable').reset_index(drop=True)
         return scores_df
 
     @staticmethod
-    def _xicordf(data, x_col, y_col, ties='auto'):
+    def _xicordf(data, x_col, y_col, ties='auto', compute_pvalue=False):
         """
         Calculate the Xi correlation for specified columns in a DataFrame.
 
@@ -164,6 +357,8 @@ class CorrelationAnalyzer:
             - 'auto' (default): Decide based on the uniqueness of y values.
             - True: Assume ties are present.
             - False: Assume no ties are present.
+        compute_pvalue : bool, optional
+            Whether to compute the p-value (default is False, which reports None).
 
         Returns
         -------
@@ -172,11 +367,11 @@ class CorrelationAnalyzer:
         """
         x = data[x_col].values
         y = data[y_col].values
-        xicor, p_value = CorrelationAnalyzer._get_xicor(x, y, ties=ties)
+        xicor, p_value = CorrelationAnalyzer._get_xicor(x, y, ties=ties, compute_pvalue=compute_pvalue)
         return {'x': x_col, 'y': y_col, 'xicor': xicor, 'p-value': p_value}
 
     @staticmethod
-    def _get_xicor(x, y, ties="auto"):
+    def _get_xicor(x, y, ties="auto", compute_pvalue=False):
         """
         Calculate the Xi correlation coefficient and p-value between two arrays.
 
@@ -191,13 +386,15 @@ class CorrelationAnalyzer:
             - 'auto' (default): Decide based on the uniqueness of y values.
             - True: Assume ties are present.
             - False: Assume no ties are present.
+        compute_pvalue : bool, optional
+            Whether to compute the p-value (default is False).
 
         Returns
         -------
         statistic : float
             The Xi correlation coefficient.
-        p_value : float
-            The p-value for the Xi correlation.
+        p_value : float or None
+            The p-value for the Xi correlation, or None if compute_pvalue is False.
 
         Raises
         ------
@@ -213,24 +410,7 @@ class CorrelationAnalyzer:
         if len(x) != n:
             raise IndexError(f"x, y length mismatch: {len(x)}, {len(y)}")
 
-        if ties == "auto":
-            ties = len(np.unique(y)) < n
-        elif not isinstance(ties, bool):
-            raise ValueError(f"Expected ties to be either 'auto' or boolean, got {ties} ({type(ties)}) instead")
-
-        y = y[np.argsort(x)]
-        r = rankdata(y, method="ordinal")
-        nominator = np.sum(np.abs(np.diff(r)))
-
-        if ties:
-            l = rankdata(y, method="max")
-            denominator = 2 * np.sum(l * (n - l))
-            nominator *= n
-        else:
-            denominator = np.power(n, 2) - 1
-            nominator *= 3
-
-        statistic = 1 - nominator / denominator
-        p_value = norm.sf(statistic, scale=2 / 5 / np.sqrt(n))
+        statistic = _xi_statistics(x[:, None], y, ties=ties, use_cache=False)[0]
+        p_value = norm.sf(statistic, scale=2 / 5 / np.sqrt(n)) if compute_pvalue else None
 
         return statistic, p_value
\ No newline at end of file
@@ -1,3 +1,5 @@
+import numpy as np
+import pandas as pd
 import altair as alt
 import seaborn as sns
 alt.themes.enable("opaque")
@@ -18,10 +20,12 @@ def plot_correlation(ax, corr_df, cmap = sns.diverging_palette(240, 10, as_cmap=
         matplotlib.axes.Axes: The Axes object with the heatmap.
     """
     columns= list(corr_df.columns)
-    corr=corr_df.pivot(index=columns[1],
-                       columns=columns[0], 
-                       values=columns[-1])
-    ax=sns.heatmap(corr.T,  linewidths=.5, cmap=cmap, center=0, annot=True, fmt=".1g")
+    rows, row_names = pd.factorize(corr_df[columns[0]], sort=True)
+    cols, col_names = pd.factorize(corr_df[columns[1]], sort=True)
+    mat = np.full((len(row_names), len(col_names)), np.nan)
+    mat[rows, cols] = corr_df[columns[-1]].to_numpy()
+    corr = pd.DataFrame(mat, index=pd.Index(row_names, name=columns[0]), columns=pd.Index(col_names, name=columns[1]))
+    ax=sns.heatmap(corr,  linewidths=.5, cmap=cmap, center=0, annot=True, fmt=".1g")
     ax.set_xticklabels(ax.get_xticklabels(), rotation=90, horizontalalignment="right")
     ax.set_yticklabels(ax.get_yticklabels(), rotation=0, horizontalalignment="right")
     ax.set_title("")
@@ -29,7 +33,23 @@ def plot_correlation(ax, corr_df, cmap = sns.diverging_palette(240, 10, as_cmap=
     ax.set_xlabel("")
     return  ax
 
-def scatter_plot(data, variables, targets, hue_col=None, n_sample=1000, random_state=111):
+def sample_data(data, n_sample=1000, random_state=111):
+    """
+    Draws the rows used by scatter_plot, so the sample can be computed once and reused across charts.
+
+    Parameters:
+        data (pandas.DataFrame): The data to sample from.
+        n_sample (int, optional): Number of samples to draw. If None or not smaller than the data, the data is returned as is. Default is 1000.
+        random_state (int, optional): Seed for random sampling. Default is 111.
+
+    Returns:
+        pandas.DataFrame: The sampled data.
+    """
+    if n_sample is None or n_sample >= len(data):
+        return data
+    return data.sample(n=n_sample, random_state=random_state)
+
+def scatter_plot(data, variables, targets, hue_col=None, n_sample=1000, random_state=111, sampled_data=None):
     
     """
     Creates a scatter plot matrix using Altair.
@@ -41,11 +61,12 @@ def scatter_plot(data, variables, targets, hue_col=None, n_sample=1000, random_s
         hue_col (str, optional): Column name for the color encoding. Default is None.
         n_sample (int, optional): Number of samples to draw from the data for plotting. Default is 1000.
         random_state (int, optional): Seed for random sampling. Default is 111.
+        sampled_data (pandas.DataFrame, optional): Precomputed output of sample_data to plot instead of sampling data again. Default is None.
 
     Returns:
         alt.Chart: The Altair chart object with the scatter plot matrix.
     """
-    data = data.sample(n=n_sample,random_state=random_state) if n_sample is not None else data
+    data = sampled_data if sampled_data is not None else sample_data(data, n_sample, random_state)
     chart=alt.Chart(data)
     if hue_col is not None:
         chart=chart.mark_circle().encode(
@@ -86,17 +107,11 @@ def visualise_timeseries_altair(data,  y_col, figure_path=None, y_label='Power (
     Returns:
     alt.Chart: The Altair chart object with the time series plot.
     """
-    chart = alt.Chart(data.reset_index()).mark_point().encode(
-            x=alt.X('timestamp:T', axis=alt.Axis(title='Date')),
-            y = alt.X(f'{y_col[0]}:Q', title=y_label),
-            color=alt.value(colors[0])
-        )
-    if len(y_col)>1:
-        for i in range(1, len(y_col)):
-            chart+=alt.Chart(data.reset_index()).mark_point().encode(
+    long_data = data.reset_index().melt(id_vars='timestamp', value_vars=y_col, var_name='series', value_name='value')
+    chart = alt.Chart(long_data).mark_point().encode(
             x=alt.X('timestamp:T', axis=alt.Axis(title='Date')),
-            y = alt.X(f'{y_col[i]}:Q', title=y_label),
-            color=alt.value(colors[i])
+            y=alt.Y('value:Q', title=y_label),
+            color=alt.Color('series:N', scale=alt.Scale(domain=y_col, range=colors[:len(y_col)]), title=None)
         )
     chart=chart.configure_axis(
         grid=False,